@@ -1,36 +1,83 @@
 from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.openapi.models import HTTPBearer as HTTPBearerModel
+from fastapi.security.base import SecurityBase
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from cachetools import TTLCache
+from dataclasses import dataclass
 from app.db.session import get_db
 from app.db.models import User
 from app.core.security import decode_token
+from functools import lru_cache
 from typing import Callable
 
-security = HTTPBearer(auto_error=False)
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    id: int
+    email: str
+    full_name: str | None
+    role: str
+    is_active: bool
 
-async def get_current_user(request: Request, db: AsyncSession = Depends(get_db), credentials: HTTPAuthorizationCredentials | None = Depends(security)) -> User:
-    if credentials is None:
+_user_cache: TTLCache[int, UserSnapshot] = TTLCache(maxsize=2048, ttl=5)
+
+def invalidate_user(user_id: int) -> None:
+    _user_cache.pop(user_id, None)
+
+class BearerHeader(SecurityBase):
+    def __init__(self):
+        self.model = HTTPBearerModel()
+        self.scheme_name = "HTTPBearer"
+
+    async def __call__(self, request: Request) -> str | None:
+        return request.headers.get("authorization")
+
+authorization_header = BearerHeader()
+
+async def _bearer(h: str | None = Depends(authorization_header)) -> str | None:
+    if h and h[:7].lower() == "bearer ":
+        return h[7:].strip() or None
+    return None
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    id: int
+    role: str
+
+async def get_current_claims(request: Request, token: str | None = Depends(_bearer)) -> CurrentUser:
+    if token is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     try:
-        payload = decode_token(credentials.credentials)
+        payload = decode_token(token)
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     if payload.get("typ") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
     user_id = payload.get("sub")
-    if not user_id:
+    role = payload.get("role")
+    if not user_id or not role:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    claims = CurrentUser(id=int(user_id), role=role)
+    request.state.user_id = claims.id
+    return claims
+
+async def get_current_user(db: AsyncSession = Depends(get_db), claims: CurrentUser = Depends(get_current_claims)) -> UserSnapshot:
+    user = _user_cache.get(claims.id)
+    if user is None:
+        result = await db.execute(select(User.id, User.email, User.full_name, User.role, User.is_active).where(User.id == claims.id))
+        row = result.one_or_none()
+        if row is not None:
+            user = UserSnapshot(**row._mapping)
+            _user_cache[claims.id] = user
     if user is None or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found")
-    request.state.user_id = user.id
     return user
 
+@lru_cache(maxsize=None)
 def require_roles(*roles: str) -> Callable:
-    async def checker(user: User = Depends(get_current_user)) -> User:
-        if user.role not in roles:
+    allowed = frozenset(roles)
+    async def checker(user: CurrentUser = Depends(get_current_claims)) -> CurrentUser:
+        if user.role not in allowed:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
         return user
     return checker
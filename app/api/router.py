@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends
 from app.api.routes import auth, users, public
 from app.core.config import get_settings
-from app.core.rate_limit import rate_limit
+from app.core.rate_limit import extract_identity, rate_limit
 
 settings = get_settings()
-api_router = APIRouter(prefix=settings.API_V1_STR, dependencies=[Depends(rate_limit("api", settings.RATE_LIMIT_DEFAULT_LIMIT, settings.RATE_LIMIT_DEFAULT_WINDOW))])
-api_router.include_router(public.router)
-api_router.include_router(auth.router)
-api_router.include_router(users.router)
+_DEFAULT_LIMIT = settings.RATE_LIMIT_DEFAULT_LIMIT
+_DEFAULT_WINDOW = settings.RATE_LIMIT_DEFAULT_WINDOW
+public_router = APIRouter(prefix=settings.API_V1_STR)
+public_router.include_router(public.router)
+rate_limited_router = APIRouter(prefix=settings.API_V1_STR, dependencies=[Depends(extract_identity), Depends(rate_limit("api", _DEFAULT_LIMIT, _DEFAULT_WINDOW))])
+rate_limited_router.include_router(auth.router)
+rate_limited_router.include_router(users.router)
+api_router = APIRouter()
+api_router.include_router(public_router)
+api_router.include_router(rate_limited_router)
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends
-from app.api.deps import get_current_user, require_roles
+from fastapi.responses import ORJSONResponse
+from app.api.deps import UserSnapshot, get_current_user, require_roles
 from app.schemas.user import UserRead
-from app.db.models import User
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserRead)
-async def me(user: User = Depends(get_current_user)):
-    return user
+async def me(user: UserSnapshot = Depends(get_current_user)):
+    return ORJSONResponse({"id": user.id, "email": user.email, "full_name": user.full_name, "role": user.role, "is_active": user.is_active})
 
 @router.get("/admin/secret", dependencies=[Depends(require_roles("admin"))])
 async def admin_secret():
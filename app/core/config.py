@@ -9,10 +9,16 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRES_DAYS: int = 7
     JWT_ALGORITHM: str = "HS256"
     DATABASE_URL: str = "sqlite+aiosqlite:///./app.db"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800
     RATE_LIMIT_DEFAULT_LIMIT: int = 60
     RATE_LIMIT_DEFAULT_WINDOW: int = 60
     RATE_LIMIT_LOGIN_LIMIT: int = 5
     RATE_LIMIT_LOGIN_WINDOW: int = 60
+    RATE_LIMIT_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_TIMEOUT_SECONDS: float = 0.5
     ENVIRONMENT: str = "dev"
     model_config = SettingsConfigDict(env_file=".env", env_prefix="", extra="ignore")
 
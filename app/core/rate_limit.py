@@ -1,50 +1,147 @@
+import logging
 import time
-from typing import Dict, Tuple
+from threading import Lock
+from typing import List, Protocol, Tuple
+from cachetools import TTLCache
 from fastapi import Request, HTTPException, status, Depends
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
 from app.core.config import get_settings
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+class RateLimiter(Protocol):
+    async def allow(self, key: str, limit: int, window: int) -> bool: ...
+
+    async def close(self) -> None: ...
+
+TOKEN_SCALE = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+
 class TokenBucket:
-    def __init__(self, capacity: int, refill_rate: float):
+    def __init__(self, capacity: int, window: int):
         self.capacity = capacity
-        self.tokens = capacity
-        self.refill_rate = refill_rate
-        self.last_refill = time.monotonic()
+        self.capacity_scaled = capacity * TOKEN_SCALE
+        self.tokens_scaled = self.capacity_scaled
+        self.refill_den = window * NS_PER_SECOND
+        self.last_refill_ns = time.monotonic_ns()
 
     def allow(self, cost: int = 1) -> bool:
-        now = time.monotonic()
-        elapsed = now - self.last_refill
-        refill = elapsed * self.refill_rate
+        now = time.monotonic_ns()
+        refill = (now - self.last_refill_ns) * self.capacity_scaled // self.refill_den
         if refill > 0:
-            self.tokens = min(self.capacity, self.tokens + refill)
-            self.last_refill = now
-        if self.tokens >= cost:
-            self.tokens -= cost
+            tokens = self.tokens_scaled + refill
+            self.tokens_scaled = tokens if tokens < self.capacity_scaled else self.capacity_scaled
+            self.last_refill_ns = now
+        cost_scaled = cost * TOKEN_SCALE
+        if self.tokens_scaled >= cost_scaled:
+            self.tokens_scaled -= cost_scaled
             return True
         return False
 
+SHARD_COUNT = 64
+STORE_MAXSIZE = 100_000
+STORE_TTL = max(4 * max(settings.RATE_LIMIT_DEFAULT_WINDOW, settings.RATE_LIMIT_LOGIN_WINDOW), 300)
+
 class InMemoryStore:
-    def __init__(self):
-        self.buckets: Dict[str, TokenBucket] = {}
+    def __init__(self, maxsize: int = STORE_MAXSIZE, ttl: int = STORE_TTL):
+        shard_size = max(maxsize // SHARD_COUNT, 1)
+        self.shards: List[TTLCache[str, TokenBucket]] = [TTLCache(maxsize=shard_size, ttl=ttl) for _ in range(SHARD_COUNT)]
+        self.locks: List[Lock] = [Lock() for _ in range(SHARD_COUNT)]
 
     def get_bucket(self, key: str, capacity: int, window: int) -> TokenBucket:
-        rate = capacity / float(window)
-        bucket = self.buckets.get(key)
-        if bucket is None or bucket.capacity != capacity or bucket.refill_rate != rate:
-            bucket = TokenBucket(capacity, rate)
-            self.buckets[key] = bucket
+        h = hash(key) & (SHARD_COUNT - 1)
+        shard = self.shards[h]
+        with self.locks[h]:
+            bucket = shard.get(key)
+            if bucket is None:
+                bucket = TokenBucket(capacity, window)
+            shard[key] = bucket
         return bucket
 
-store = InMemoryStore()
+    async def allow(self, key: str, limit: int, window: int) -> bool:
+        return self.get_bucket(key, limit, window).allow(1)
+
+    async def close(self) -> None:
+        pass
+
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local current = math.floor(now / window)
+local elapsed = now - current * window
+local curr_field = tostring(current)
+local prev_field = tostring(current - 1)
+local counts = redis.call('HMGET', KEYS[1], prev_field, curr_field)
+local prev = tonumber(counts[1] or '0')
+local curr = tonumber(counts[2] or '0')
+if prev * (window - elapsed) / window + curr >= limit then
+  return 0
+end
+redis.call('HINCRBY', KEYS[1], curr_field, 1)
+local fields = redis.call('HKEYS', KEYS[1])
+for _, field in ipairs(fields) do
+  if field ~= curr_field and field ~= prev_field then
+    redis.call('HDEL', KEYS[1], field)
+  end
+end
+redis.call('EXPIRE', KEYS[1], window * 2)
+return 1
+"""
+
+class RedisSlidingWindow:
+    def __init__(self, url: str, timeout: float):
+        self.redis = aioredis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.script = self.redis.register_script(SLIDING_WINDOW_LUA)
+
+    async def allow(self, key: str, limit: int, window: int) -> bool:
+        try:
+            return bool(await self.script(keys=[f"rl:{key}"], args=[limit, window]))
+        except RedisError as exc:
+            logger.warning("Redis rate limiter unavailable, allowing request: %s", exc)
+            return True
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+def _build_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisSlidingWindow(settings.REDIS_URL, settings.REDIS_TIMEOUT_SECONDS)
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return InMemoryStore()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+limiter = _build_limiter()
+
+def _first_xff(h: str) -> str:
+    i = h.find(",")
+    return h[:i].strip() if i >= 0 else h.strip()
+
+def _client_ip(request: Request) -> str:
+    xff = request.headers.get("x-forwarded-for")
+    if xff is not None:
+        return _first_xff(xff)
+    return request.client.host if request.client else "unknown"
+
+def _identity(request: Request) -> Tuple[int | None, str]:
+    identity = getattr(request.state, "rl_identity", None)
+    if identity is None:
+        uid = getattr(request.state, "user_id", None)
+        identity = (uid, _client_ip(request))
+        request.state.rl_identity = identity
+    return identity
+
+async def extract_identity(request: Request):
+    _identity(request)
 
 def rate_limit(bucket_id: str, limit: int, window: int):
     async def dependency(request: Request):
-        uid = getattr(request.state, "user_id", None)
-        ip = request.headers.get("x-forwarded-for", request.client.host if request.client else "unknown").split(",")[0].strip()
+        uid, ip = _identity(request)
         suffix = str(uid) if uid is not None else ip
-        key = f"{bucket_id}:{suffix}"
-        bucket = store.get_bucket(key, limit, window)
-        if not bucket.allow(1):
+        key = f"{bucket_id}:{limit}:{window}:{suffix}"
+        if not await limiter.allow(key, limit, window):
             raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
     return dependency
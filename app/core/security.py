@@ -1,30 +1,51 @@
 from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+import jwt
+import bcrypt
+from cachetools import TTLCache
+from threading import Lock
 from app.core.config import get_settings
+import time
 import uuid
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 settings = get_settings()
+_SIGNING_KEY = settings.SECRET_KEY.encode()
+_ALG = settings.JWT_ALGORITHM
+_ALGORITHMS = [_ALG]
+_ACCESS_TD = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRES_MINUTES)
+_REFRESH_DAYS = settings.REFRESH_TOKEN_EXPIRES_DAYS
+_decode_cache: TTLCache = TTLCache(maxsize=4096, ttl=30)
+_decode_lock = Lock()
+
+BCRYPT_ROUNDS = 12
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except ValueError:
+        return False
 
 def create_access_token(subject: str, role: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRES_MINUTES)
+    expire = datetime.now(timezone.utc) + _ACCESS_TD
     to_encode = {"sub": subject, "exp": expire, "role": role, "typ": "access"}
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    return jwt.encode(to_encode, _SIGNING_KEY, algorithm=_ALG)
 
 def create_refresh_token(user_id: int, jti: str | None = None, expires_days: int | None = None) -> tuple[str, str, datetime]:
     jti = jti or str(uuid.uuid4())
-    days = settings.REFRESH_TOKEN_EXPIRES_DAYS if expires_days is None else expires_days
+    days = _REFRESH_DAYS if expires_days is None else expires_days
     expire = datetime.now(timezone.utc) + timedelta(days=days)
     to_encode = {"sub": str(user_id), "exp": expire, "jti": jti, "typ": "refresh"}
-    token = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    token = jwt.encode(to_encode, _SIGNING_KEY, algorithm=_ALG)
     return token, jti, expire
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    with _decode_lock:
+        payload = _decode_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return dict(payload)
+    payload = jwt.decode(token, _SIGNING_KEY, algorithms=_ALGORITHMS)
+    with _decode_lock:
+        _decode_cache[token] = payload
+    return dict(payload)
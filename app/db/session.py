@@ -1,8 +1,18 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
 from app.core.config import get_settings
 
 settings = get_settings()
-engine = create_async_engine(settings.DATABASE_URL, future=True)
+
+def _engine_kwargs(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"poolclass": NullPool}
+    kwargs = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW, "pool_pre_ping": True, "pool_recycle": settings.DB_POOL_RECYCLE}
+    if url.startswith("postgresql+asyncpg"):
+        kwargs["connect_args"] = {"server_settings": {"jit": "off"}}
+    return kwargs
+
+engine = create_async_engine(settings.DATABASE_URL, future=True, **_engine_kwargs(settings.DATABASE_URL))
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 async def get_db():
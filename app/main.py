@@ -1,12 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api.router import api_router
 from app.core.config import get_settings
+from app.core.rate_limit import limiter
 from app.db.session import engine
 from app.db.init_db import init_db
 
 settings = get_settings()
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,4 +22,8 @@ app.add_middleware(
 async def on_startup():
     await init_db(engine)
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await limiter.close()
+
 app.include_router(api_router)